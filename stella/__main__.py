@@ -1,18 +1,82 @@
 import argparse
 import logging
+import sys
+from functools import partial
 
 from stella.gui.window import Window
 from stella.tello.exceptions import TelloNoConnection
+from stella.tello.sources import FileSource, PipeSource, TestPatternSource
 from stella.utils.logging import set_logging
 
+
+def test_pattern_spec(value: str) -> tuple[int, int, int]:
+    try:
+        size, fps = value.split("@")
+        width, height = size.split("x")
+        spec = int(width), int(height), int(fps)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected WIDTHxHEIGHT@FPS, e.g. 960x720@30, got {value!r}"
+        )
+
+    if min(spec) <= 0:
+        raise argparse.ArgumentTypeError("width, height and fps must be positive")
+
+    return spec
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--share-frames",
+        action="store_true",
+        help="publish decoded frames to shared memory for other local processes",
+    )
+    parser.add_argument(
+        "--adaptive-quality",
+        action="store_true",
+        help="adjust video resolution, fps and bitrate to link quality (requires SDK 3.0)",
+    )
+    offline = parser.add_mutually_exclusive_group()
+    offline.add_argument(
+        "--video",
+        metavar="PATH",
+        help="play a recorded H.264/MP4 file instead of connecting to Tello, - reads raw H.264 from stdin",
+    )
+    offline.add_argument(
+        "--test-pattern",
+        metavar="WIDTHxHEIGHT@FPS",
+        nargs="?",
+        const=(960, 720, 30),
+        type=test_pattern_spec,
+        help="show a generated test pattern instead of connecting to Tello",
+    )
+    parser.add_argument(
+        "--max-speed",
+        action="store_true",
+        help="play --video or --test-pattern as fast as possible instead of in real time",
+    )
     args = parser.parse_args()
 
+    # Sources are opened by the window, so that probing them overlaps its setup
+    source = None
+    if args.video == "-":
+        source = partial(PipeSource, sys.stdin.buffer)
+    elif args.video:
+        source = partial(FileSource, args.video, realtime=not args.max_speed)
+    elif args.test_pattern:
+        source = partial(
+            TestPatternSource, *args.test_pattern, realtime=not args.max_speed
+        )
+
     set_logging(level=logging.DEBUG)
 
     try:
-        window = Window()
+        window = Window(
+            share_frames=args.share_frames,
+            adaptive_quality=args.adaptive_quality,
+            source=source,
+        )
         window.run()
     except TelloNoConnection:
         logging.debug("Cannot enable SDK, is Tello turned on?")
@@ -1,13 +1,21 @@
 import logging
+from typing import Optional
 
 import pygame
 from stella.tello.client import TelloClient
+from stella.tello.stream import TelloStream
 from stella.utils.files import save_photo
 
 
 class KeyboardHandler:
-    def __init__(self, tello: TelloClient) -> None:
+    def __init__(self, tello: Optional[TelloClient], stream: TelloStream) -> None:
+        """
+        Args:
+            - tello: None when playing back video, there is no drone to fly then
+        """
+
         self.tello = tello
+        self.stream = stream
 
         self.S = 50
 
@@ -71,6 +79,8 @@ class KeyboardHandler:
         elif key == pygame.K_o:
             logging.debug("DECREASE SPEED")
             self.change_speed(-10)
+        elif key in (pygame.K_SPACE, pygame.K_RETURN) and self.tello is None:
+            logging.debug("Drone controls are disabled")
         elif key == pygame.K_SPACE:
             logging.debug("TAKEOFF")
             self.tello.takeoff()
@@ -81,8 +91,8 @@ class KeyboardHandler:
             self.send_rc_command = False
         elif key == pygame.K_F12:
             logging.debug("TAKE PHOTO")
-            if self.tello.stream.frame is not None:
-                save_photo(self.tello.stream.frame)
+            if self.stream.frame is not None:
+                save_photo(self.stream.frame)
 
     def keyup(self, key: int) -> None:
         if key == pygame.K_w or key == pygame.K_s:
@@ -1,13 +1,28 @@
 import logging
 import os
+import threading
 import time
+from contextlib import contextmanager
+from importlib.resources import files
+from typing import Callable, Iterator, Optional
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
 
 import pygame
 from stella.gui.controls import KeyboardHandler
+from stella.tello.broker import FrameBroker
 from stella.tello.client import TelloClient
 from stella.tello.exceptions import TelloInvalidResponse
+from stella.tello.quality import VideoQualityController
+from stella.tello.sources import VideoSource
+from stella.tello.stream import TelloStream
+
+ASSETS = files("stella.gui") / "assets"
+
+
+def load_asset(name: str) -> pygame.Surface:
+    with (ASSETS / name).open("rb") as f:
+        return pygame.image.load(f, name)
 
 
 class Window:
@@ -18,57 +33,188 @@ class Window:
         title: str = "STELLA",
         resolution: tuple[int, int] = (960, 720),
         fps: int = 60,
+        share_frames: bool = False,
+        adaptive_quality: bool = False,
+        source: Optional[Callable[[], VideoSource]] = None,
     ) -> None:
-        self.fps = fps
+        """
+        Args:
+            - source: factory of a source to play video from instead of connecting to Tello,
+              called in the background so that opening it overlaps display setup
+        """
 
-        pygame.init()
+        self.fps = fps
+        self.adaptive_quality = adaptive_quality
+        self.source = source
 
-        icon = pygame.image.load("stella/gui/assets/favicon.png")
+        self.startup_timestamp = time.perf_counter()
+        # Phase name -> (start, end) offsets in seconds from startup, end is None while in progress
+        self.startup_phases: dict[str, tuple[float, Optional[float]]] = {}
+        self.startup_error: Optional[Exception] = None
 
-        self.display = pygame.display.set_mode(resolution)
-        pygame.display.set_caption(title)
-        pygame.display.set_icon(icon)
+        self.broker = FrameBroker() if share_frames else None
+        self.stream: Optional[TelloStream] = None
+        # Offline playback must not take Tello's ports, another instance may be flying
+        self.tello = TelloClient(broker=self.broker) if source is None else None
 
-        self.prepare_assets()
+        # Talking to Tello is mostly waiting on the network, do it while the display is being set up
+        self.battery_level: Optional[int] = None
+        self.battery_thread = threading.Thread()
+        self.quality_controller: Optional[VideoQualityController] = None
+        self.connect_thread = threading.Thread(
+            target=self._connect, name="TelloConnect", daemon=True
+        )
+        self.connect_thread.start()
 
-        self.tello = TelloClient()
-        self.tello.connect()
+        with self.startup_phase("display"):
+            # Only the subsystems we use, pygame.init() would also bring up audio and joysticks
+            pygame.display.init()
+            pygame.font.init()
 
-        self.event_handler = KeyboardHandler(self.tello)
+            self.display = pygame.display.set_mode(resolution)
+            pygame.display.set_caption(title)
+            pygame.display.set_icon(load_asset("favicon.png"))
 
-        self.battery_level = self.tello.get_battery()
+        with self.startup_phase("assets"):
+            self.prepare_assets()
 
-        pygame.time.set_timer(self.CHECK_BATTERY, 15000)
+        if self.tello is not None:
+            pygame.time.set_timer(self.CHECK_BATTERY, 15000)
 
     @property
     def resolution(self) -> tuple[int, int]:
         display_info = pygame.display.Info()
         return display_info.current_w, display_info.current_h
 
+    @contextmanager
+    def startup_phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter() - self.startup_timestamp
+        self.startup_phases[name] = (start, None)
+        yield
+        self.startup_phases[name] = (
+            start,
+            time.perf_counter() - self.startup_timestamp,
+        )
+
+    def _connect(self) -> None:
+        if self.tello is None:
+            # Offline playback, there is no drone to talk to
+            try:
+                with self.startup_phase("stream"):
+                    self.stream = TelloStream(source=self.source(), broker=self.broker)
+            except Exception as e:
+                self.startup_error = e
+            return
+
+        try:
+            with self.startup_phase("sdk"):
+                self.tello.connect(wait_for_state=False)
+
+            # Decoder probing takes the longest, run it alongside the remaining handshake
+            stream_thread = threading.Thread(
+                target=self._enable_stream, name="TelloStreamStart", daemon=True
+            )
+            stream_thread.start()
+
+            with self.startup_phase("battery"):
+                self.battery_level = self.tello.get_battery()
+
+            with self.startup_phase("state"):
+                self.tello.wait_for_state()
+
+            stream_thread.join()
+        except Exception as e:
+            self.startup_error = e
+
+    def _enable_stream(self) -> None:
+        try:
+            with self.startup_phase("stream"):
+                self.tello.enable_stream()
+                self.stream = self.tello.stream
+        except Exception as e:
+            self.startup_error = e
+
     def prepare_assets(self) -> None:
         self.font = pygame.font.SysFont("Arial", 16)
 
-        self.logo_image = pygame.image.load("stella/gui/assets/logo.png")
+        self.logo_image = load_asset("logo.png")
         self.logo_image = pygame.transform.scale(self.logo_image, (160, 40))
-        self.logo_image.convert_alpha()
+        self.logo_image = self.logo_image.convert_alpha()
         self.logo_image.set_alpha(180)
         self.logo_rect = self.logo_image.get_rect(center=(96, 32))
 
-        self.battery_image = pygame.image.load("stella/gui/assets/battery.png")
-        self.battery_image.convert_alpha()
+        self.battery_image = load_asset("battery.png").convert_alpha()
         self.battery_rect = self.battery_image.get_rect(
             center=(self.resolution[0] - 72, 32)
         )
 
-        self.speed_image = pygame.image.load("stella/gui/assets/speed.png")
-        self.speed_image.convert_alpha()
+        self.speed_image = load_asset("speed.png").convert_alpha()
         self.speed_rect = self.speed_image.get_rect(
             center=(self.resolution[0] - 72, 96)
         )
 
+    def draw_startup(self) -> None:
+        now = time.perf_counter() - self.startup_timestamp
+
+        self.display.fill((0, 0, 0))
+        self.display.blit(
+            self.logo_image,
+            self.logo_image.get_rect(center=(self.resolution[0] // 2, 200)),
+        )
+
+        connecting_text = self.font.render(
+            f"Connecting to Tello... {now:.1f} s", True, (255, 255, 255, 255)
+        )
+        self.display.blit(
+            connecting_text,
+            connecting_text.get_rect(center=(self.resolution[0] // 2, 260)),
+        )
+
+        for i, (name, (start, end)) in enumerate(list(self.startup_phases.items())):
+            duration = (end if end is not None else now) - start
+            status = "" if end is not None else " ..."
+            phase_text = self.font.render(
+                f"{name}: {duration:.2f} s{status}", True, (180, 180, 180, 255)
+            )
+            self.display.blit(
+                phase_text,
+                phase_text.get_rect(center=(self.resolution[0] // 2, 300 + i * 24)),
+            )
+
+    def wait_for_first_frame(self) -> None:
+        """Shows the connecting screen until Tello is connected and the first frame is decoded."""
+
+        with self.startup_phase("first frame"):
+            while (
+                self.connect_thread.is_alive()
+                or self.stream is None
+                or self.stream.frame is None
+            ):
+                if self.startup_error is not None:
+                    raise self.startup_error
+
+                for e in pygame.event.get():
+                    if e.type == pygame.QUIT:
+                        raise KeyboardInterrupt
+
+                self.draw_startup()
+                pygame.display.update()
+
+                time.sleep(1 / self.fps)
+
+        logging.debug(
+            "Startup finished: "
+            + ", ".join(
+                f"{name} {end - start:.2f} s"
+                for name, (start, end) in self.startup_phases.items()
+            )
+        )
+
     def draw_battery_level(self) -> None:
         battery_level_text = self.font.render(
-            f"{self.battery_level}%", True, (255, 255, 255, 255)
+            f"{self.battery_level}%" if self.battery_level is not None else "-",
+            True,
+            (255, 255, 255, 255),
         )
         battery_level_rect = battery_level_text.get_rect(
             center=(self.resolution[0] - 56, 32)
@@ -127,18 +273,48 @@ class Window:
         )
 
     def run(self) -> None:
+        try:
+            self.wait_for_first_frame()
+            self.loop()
+        except KeyboardInterrupt:
+            logging.debug("Program terminated by user")
+        finally:
+            self.close()
+
+    def _check_battery(self) -> None:
+        try:
+            self.battery_level = self.tello.get_battery()
+        except (TelloInvalidResponse, TimeoutError):
+            logging.debug("Could not check battery level", exc_info=True)
+
+    def close(self) -> None:
+        if self.quality_controller is not None:
+            self.quality_controller.stop()
+
+        # The stream thread publishes into the broker, so it has to stop first
+        if self.stream is not None:
+            self.stream.close()
+
+        if self.broker is not None:
+            self.broker.close()
+
+    def loop(self) -> None:
         def fill_control(rect: pygame.Rect) -> None:
             self.display.fill((255, 255, 102), rect, special_flags=pygame.BLEND_MAX)
 
-        self.tello.enable_stream()
-        stream = self.tello.stream
+        stream = self.stream
+        self.event_handler = KeyboardHandler(self.tello, stream)
 
-        if stream.frame is None:
-            time.sleep(0.1)
+        if self.adaptive_quality and self.tello is not None:
+            self.quality_controller = VideoQualityController(self.tello)
+            self.quality_controller.start()
 
         while True:
             try:
                 surf = pygame.surfarray.make_surface(stream.frame)
+                # Tello may switch stream resolution on the fly
+                if surf.get_size() != self.resolution:
+                    surf = pygame.transform.scale(surf, self.resolution)
                 self.display.blit(surf, (0, 0))
 
                 for e in pygame.event.get():
@@ -161,7 +337,14 @@ class Window:
                         elif e.key == pygame.K_RIGHT:
                             fill_control(self.right_rect)
                     elif e.type == self.CHECK_BATTERY:
-                        self.tello.get_battery()
+                        # Commands wait for each other, keep the UI loop and rc updates going meanwhile
+                        if not self.battery_thread.is_alive():
+                            self.battery_thread = threading.Thread(
+                                target=self._check_battery,
+                                name="TelloBatteryCheck",
+                                daemon=True,
+                            )
+                            self.battery_thread.start()
 
                 self.display.blit(self.logo_image, self.logo_rect)
                 self.draw_controls()
@@ -170,8 +353,5 @@ class Window:
                 pygame.display.update()
 
                 time.sleep(1 / self.fps)
-            except KeyboardInterrupt:
-                logging.debug("Program terminated by user")
-                break
             except TelloInvalidResponse:
                 pass
@@ -0,0 +1,193 @@
+import logging
+import socket
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+from stella.tello.constants import (
+    BROKER_CONTROL_PORT,
+    BROKER_SHM_NAME,
+    BROKER_SLOTS,
+    BROKER_SUBSCRIBER_LEASE,
+    TELLO_STREAM_HEIGHT,
+    TELLO_STREAM_WIDTH,
+)
+from stella.tello.reactor import TelloReactor, get_reactor
+
+# Ring layout: a header followed by `slots` fixed-size slots.
+# Header: latest published sequence number, slot count, slot payload size.
+RING_HEADER = struct.Struct("<QII")
+# Slot header: sequence number of the frame in the slot (0 while being written) and its shape.
+SLOT_HEADER = struct.Struct("<QIII")
+
+
+def ring_size(slots: int, slot_size: int) -> int:
+    return RING_HEADER.size + slots * (SLOT_HEADER.size + slot_size)
+
+
+def slot_offset(index: int, slot_size: int) -> int:
+    return RING_HEADER.size + index * (SLOT_HEADER.size + slot_size)
+
+
+class FrameBroker:
+    """
+    Publishes decoded frames into a shared memory ring for other local processes.
+
+    Frames are RGB arrays of shape (height, width, 3), as decoded. Slots start out sized
+    for `slot_size` bytes, a larger frame replaces the ring with one that fits it and
+    subscribers are sent the new ring description.
+
+    Consumers subscribe through a UDP control socket on localhost and are notified
+    with the sequence number of every published frame. Subscriptions are leases,
+    a consumer that does not renew within `BROKER_SUBSCRIBER_LEASE` is dropped.
+    See `FrameSubscriber`.
+    """
+
+    def __init__(
+        self,
+        name: str = BROKER_SHM_NAME,
+        port: int = BROKER_CONTROL_PORT,
+        slots: int = BROKER_SLOTS,
+        slot_size: int = TELLO_STREAM_WIDTH * TELLO_STREAM_HEIGHT * 3,
+        reactor: Optional[TelloReactor] = None,
+    ) -> None:
+        self.name = name
+        self.slots = slots
+        self.sequence = 0
+        # Held while writing to the ring so it cannot be unmapped mid-frame
+        self.lock = threading.Lock()
+
+        self._create_ring(slot_size)
+
+        self.port = port
+
+        # Subscriber address -> time of the last subscribe/renewal
+        self.subscribers: dict[tuple[str, int], float] = {}
+        self.subscribers_lock = threading.Lock()
+
+        self.reactor = reactor if reactor is not None else get_reactor()
+        self._open_socket()
+
+    def __del__(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if getattr(self, "shm", None) is None:
+            return
+
+        with self.lock:
+            self.reactor.unregister(self.socket)
+            self.socket.close()
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def _create_ring(self, slot_size: int) -> None:
+        self.slot_size = slot_size
+        self.shm = shared_memory.SharedMemory(
+            name=self.name, create=True, size=ring_size(self.slots, slot_size)
+        )
+        RING_HEADER.pack_into(self.shm.buf, 0, self.sequence, self.slots, slot_size)
+
+    def ring_description(self) -> bytes:
+        ring = f"shm:{self.shm.name};slots:{self.slots};size:{self.slot_size}"
+        return ring.encode("ascii")
+
+    def _open_socket(self) -> None:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", self.port))
+        self.reactor.register(self.socket, self._receive, on_error=self._reopen_socket)
+
+    def _reopen_socket(self, error: Exception) -> None:
+        with self.lock:
+            if self.shm is None:
+                return
+
+            logging.warning(f"Frame broker socket failed, reopening it: {error}")
+            self.reactor.unregister(self.socket)
+            self.socket.close()
+            self._open_socket()
+
+    def _receive(self, command: memoryview, address: tuple[str, int]) -> None:
+        if command == b"subscribe":
+            with self.subscribers_lock:
+                if address not in self.subscribers:
+                    logging.debug(f"Frame subscriber connected: {address}")
+                self.subscribers[address] = time.monotonic()
+            with self.lock:
+                ring = self.ring_description()
+            self.socket.sendto(ring, address)
+        elif command == b"unsubscribe":
+            with self.subscribers_lock:
+                self.subscribers.pop(address, None)
+            logging.debug(f"Frame subscriber disconnected: {address}")
+
+    def publish(self, frame: np.ndarray) -> Optional[int]:
+        """
+        Copies the frame into the next ring slot and notifies subscribers.
+
+        Returns the sequence number of the frame, or None if the broker is closed.
+        """
+
+        with self.lock:
+            if self.shm is None:
+                return None
+
+            resized = frame.nbytes > self.slot_size
+            if resized:
+                logging.info(
+                    f"Frame of shape {frame.shape} does not fit in a {self.slot_size} byte slot, "
+                    "resizing the frame ring"
+                )
+                # Subscribers keep their mapping of the old ring until they attach to the new one
+                self.shm.close()
+                self.shm.unlink()
+                self._create_ring(frame.nbytes)
+
+            rows, cols, channels = frame.shape
+            sequence = self.sequence + 1
+            offset = slot_offset(sequence % self.slots, self.slot_size)
+
+            # Invalidate the slot first so readers holding a view of it can detect the overwrite
+            SLOT_HEADER.pack_into(self.shm.buf, offset, 0, rows, cols, channels)
+            view = np.ndarray(
+                frame.shape,
+                dtype=np.uint8,
+                buffer=self.shm.buf,
+                offset=offset + SLOT_HEADER.size,
+            )
+            np.copyto(view, frame)
+            del view
+            SLOT_HEADER.pack_into(self.shm.buf, offset, sequence, rows, cols, channels)
+            struct.pack_into("<Q", self.shm.buf, 0, sequence)
+            self.sequence = sequence
+
+            # The ring description also wakes subscribers up, after they attach to it
+            notification = (
+                self.ring_description() if resized else str(sequence).encode("ascii")
+            )
+
+        now = time.monotonic()
+        with self.subscribers_lock:
+            for address, renewed in list(self.subscribers.items()):
+                if now - renewed > BROKER_SUBSCRIBER_LEASE:
+                    logging.debug(f"Frame subscriber lease expired: {address}")
+                    del self.subscribers[address]
+                    continue
+
+                try:
+                    self.socket.sendto(notification, address)
+                except ConnectionRefusedError:
+                    # Reported for an earlier datagram, so it cannot be attributed to this subscriber
+                    continue
+                except BlockingIOError:
+                    # Send buffer is full, the subscriber only misses this notification
+                    continue
+                except OSError:
+                    logging.debug(f"Frame subscriber gone: {address}")
+                    del self.subscribers[address]
+
+        return sequence
@@ -5,6 +5,7 @@ import time
 from enum import Enum
 from typing import Optional
 
+from stella.tello.broker import FrameBroker
 from stella.tello.constants import (
     RESPONSE_TIMEOUT,
     TELLO_CONTROL_PORT,
@@ -17,6 +18,8 @@ from stella.tello.exceptions import (
     TelloNoConnection,
     TelloNoState,
 )
+from stella.tello.reactor import TelloReactor, get_reactor
+from stella.tello.sources import UdpSource
 from stella.tello.state import TelloState
 from stella.tello.stream import TelloStream
 
@@ -33,36 +36,55 @@ class TelloFlipDirection(str, Enum):
     BACK = "b"
 
 
+class TelloVideoResolution(str, Enum):
+    HIGH = "high"  # 720p
+    LOW = "low"  # 480p
+
+
+class TelloVideoFps(str, Enum):
+    HIGH = "high"  # 30 fps
+    MIDDLE = "middle"  # 15 fps
+    LOW = "low"  # 5 fps
+
+
 class TelloClient:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        broker: Optional[FrameBroker] = None,
+        reactor: Optional[TelloReactor] = None,
+    ) -> None:
         self.tello_address = (TELLO_IP, TELLO_CONTROL_PORT)
-
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(("", TELLO_CONTROL_PORT))
+        self.reactor = reactor if reactor is not None else get_reactor()
 
         self.response: Optional[bytes] = None
+        self.command_lock = threading.Lock()
         self.last_received_timestamp: float = 0
         self.last_unsafe_command: float = 0
 
-        self.receive_thread = threading.Thread(
-            target=self._receive, name="TelloControlReceiver", daemon=True
-        )
-        self.receive_thread.start()
+        self._open_socket()
 
-        self.state = TelloState()
+        self.state = TelloState(reactor=self.reactor)
         self.stream: Optional[TelloStream] = None
+        self.broker = broker
 
     def __del__(self) -> None:
+        self.reactor.unregister(self.socket)
         self.socket.close()
 
-    def _receive(self) -> None:
-        while True:
-            try:
-                self.response, _ = self.socket.recvfrom(1024)
-                logging.debug(f"Control data received: {self.response}")
-            except Exception:
-                logging.error("Unknown error occurred", exc_info=True)
-                break
+    def _open_socket(self) -> None:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("", TELLO_CONTROL_PORT))
+        self.reactor.register(self.socket, self._receive, on_error=self._reopen_socket)
+
+    def _reopen_socket(self, error: Exception) -> None:
+        logging.warning(f"Control socket failed, reopening it: {error}")
+        self.reactor.unregister(self.socket)
+        self.socket.close()
+        self._open_socket()
+
+    def _receive(self, data: memoryview, address: tuple[str, int]) -> None:
+        self.response = bytes(data)
+        logging.debug(f"Control data received: {self.response}")
 
     def connect(self, wait_for_state: bool = True) -> None:
         try:
@@ -71,33 +93,41 @@ class TelloClient:
             raise TelloNoConnection("Could not enable SDK mode")
 
         if wait_for_state:
-            for i in range(10):
-                if self.state.get_state():
-                    logging.debug(f"Tello state received on {i+1} iteration")
-                    break
+            self.wait_for_state()
 
-                time.sleep(0.1)
+    def wait_for_state(self) -> None:
+        for i in range(10):
+            if self.state.get_state():
+                logging.debug(f"Tello state received on {i+1} iteration")
+                break
 
-            if not self.state.get_state():
-                raise TelloNoState("Did not receive a state packet from Tello")
+            time.sleep(0.1)
+
+        if not self.state.get_state():
+            raise TelloNoState("Did not receive a state packet from Tello")
 
     def send_safe(self, command: str) -> str:
-        diff = time.time() - self.last_received_timestamp
-        if diff < TIME_BETWEEN_SAFE_COMMANDS:
-            time.sleep(diff)
+        # Commands may be sent from multiple threads, but only one response can be awaited at a time
+        with self.command_lock:
+            diff = time.time() - self.last_received_timestamp
+            if diff < TIME_BETWEEN_SAFE_COMMANDS:
+                time.sleep(diff)
+
+            # Drop late replies, e.g. to unsafe commands or to a command that timed out,
+            # so they are not taken for the response to this one
+            self.response = None
+            self.socket.sendto(command.encode("utf-8"), self.tello_address)
+            timestamp = time.time()
 
-        self.socket.sendto(command.encode("utf-8"), self.tello_address)
-        timestamp = time.time()
+            while self.response is None:
+                if time.time() - timestamp > RESPONSE_TIMEOUT:
+                    raise TimeoutError("Tello did not respond in time")
+                time.sleep(0.1)
 
-        while self.response is None:
-            if time.time() - timestamp > RESPONSE_TIMEOUT:
-                raise TimeoutError("Tello did not respond in time")
-            time.sleep(0.1)
+            self.last_received_timestamp = time.time()
+            response, self.response = self.response, None
 
-        self.last_received_timestamp = time.time()
-        response, self.response = self.response, None
-
-        return response
+            return response
 
     def send_unsafe(self, command: str) -> None:
         diff = time.time() - self.last_unsafe_command
@@ -129,7 +159,9 @@ class TelloClient:
         """
 
         response = TelloControlResponse(self.send_safe("streamon"))
-        self.stream = TelloStream()
+        self.stream = TelloStream(
+            source=UdpSource(reactor=self.reactor), broker=self.broker
+        )
         return response
 
     def disable_stream(self) -> TelloControlResponse:
@@ -138,6 +170,8 @@ class TelloClient:
         """
 
         response = TelloControlResponse(self.send_safe("streamoff"))
+        if self.stream is not None:
+            self.stream.close()
         self.stream = None
         return response
 
@@ -259,6 +293,39 @@ class TelloClient:
 
         return TelloControlResponse(self.send_safe(f"ap {ssid} {password}"))
 
+    def set_resolution(self, x: TelloVideoResolution) -> TelloControlResponse:
+        """
+        Set video stream resolution.
+
+        Notes:
+            Requires SDK 3.0.
+        """
+
+        return TelloControlResponse(self.send_safe(f"setresolution {x.value}"))
+
+    def set_fps(self, x: TelloVideoFps) -> TelloControlResponse:
+        """
+        Set video stream frame rate.
+
+        Notes:
+            Requires SDK 3.0.
+        """
+
+        return TelloControlResponse(self.send_safe(f"setfps {x.value}"))
+
+    def set_bitrate(self, x: int) -> TelloControlResponse:
+        """
+        Set video stream bitrate in Mbps, 0 lets Tello choose it automatically.
+
+        Notes:
+            Requires SDK 3.0.
+        """
+
+        if x < 0 or x > 5:
+            raise ValueError("Bitrate must be in range (0;5)")
+
+        return TelloControlResponse(self.send_safe(f"setbitrate {x}"))
+
     """
     Read Commands
     """
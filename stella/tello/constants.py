@@ -5,7 +5,18 @@ TELLO_STREAM_PORT = 11111
 
 TELLO_STREAM_WIDTH = 960
 TELLO_STREAM_HEIGHT = 720
+TELLO_STREAM_BUFFER_SIZE = 1 << 20
+TELLO_STREAM_RECEIVE_BUFFER_SIZE = 384 * 1024
+STREAM_CLOSE_TIMEOUT = 1.0
 
 RESPONSE_TIMEOUT = 7.0
 TIME_BETWEEN_SAFE_COMMANDS = 0.1
 TIME_BETWEEN_UNSAFE_COMMANDS = 0.001
+
+BROKER_SHM_NAME = "stella_frames"
+BROKER_CONTROL_PORT = 11112
+BROKER_SLOTS = 8
+BROKER_SUBSCRIBER_LEASE = 5.0
+
+REACTOR_SELECT_TIMEOUT = 0.5
+REACTOR_MAX_READER_FAILURES = 100
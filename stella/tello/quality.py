@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from stella.tello.client import (
+    TelloClient,
+    TelloControlResponse,
+    TelloVideoFps,
+    TelloVideoResolution,
+)
+from stella.tello.exceptions import TelloException
+from stella.tello.stream import TelloStream
+
+
+class VideoQuality(NamedTuple):
+    resolution: TelloVideoResolution
+    fps: TelloVideoFps
+    bitrate: int
+
+
+class VideoQualityController:
+    """
+    Adjusts video stream quality based on Wi-Fi SNR and decoder telemetry.
+
+    Quality is lowered one level as soon as the link or decoder degrades, and raised
+    one level only after conditions stay good for `UPGRADE_AFTER` consecutive checks,
+    so that a noisy link does not make the stream flap between settings. Changing
+    settings makes the stream resync, so nothing is evaluated for `COOLDOWN_CHECKS`
+    checks afterwards. A level is only taken once Tello accepted all of its settings.
+
+    Lost datagrams rarely surface as decoder errors, the decoder just produces fewer
+    frames, so drops are measured as the shortfall against the nominal frame rate.
+    """
+
+    # Ordered from the best to the worst quality, the first level is Tello's default
+    LEVELS = [
+        VideoQuality(TelloVideoResolution.HIGH, TelloVideoFps.HIGH, 0),
+        VideoQuality(TelloVideoResolution.HIGH, TelloVideoFps.HIGH, 4),
+        VideoQuality(TelloVideoResolution.HIGH, TelloVideoFps.HIGH, 3),
+        VideoQuality(TelloVideoResolution.LOW, TelloVideoFps.HIGH, 2),
+        VideoQuality(TelloVideoResolution.LOW, TelloVideoFps.MIDDLE, 1),
+    ]
+
+    FPS_VALUES = {
+        TelloVideoFps.HIGH: 30,
+        TelloVideoFps.MIDDLE: 15,
+        TelloVideoFps.LOW: 5,
+    }
+
+    SNR_DEGRADE = 40
+    SNR_UPGRADE = 60
+    DECODE_LAG_DEGRADE = 0.05
+    DECODE_LAG_UPGRADE = 0.02
+    # Fraction of the expected frames that did not come out of the decoder
+    DROP_RATE_DEGRADE = 0.1
+    DROP_RATE_UPGRADE = 0.02
+    UPGRADE_AFTER = 3
+    COOLDOWN_CHECKS = 2
+
+    def __init__(self, tello: TelloClient, interval: float = 2.0) -> None:
+        self.tello = tello
+        self.interval = interval
+
+        self.level = 0
+        # Settings Tello accepted, differ from the level's when a change was rejected midway
+        self.applied = self.LEVELS[0]
+        self.good_checks = 0
+        self.cooldown = 0
+
+        self.stream: Optional[TelloStream] = None
+        self.last_check_timestamp = 0.0
+        self.last_frames_decoded = 0
+        self.last_frames_dropped = 0
+
+        self.running = False
+        self.control_thread = threading.Thread(
+            target=self._control, name="TelloQualityController", daemon=True
+        )
+
+    def start(self) -> None:
+        self.running = True
+        self.control_thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+
+    def _control(self) -> None:
+        while self.running:
+            time.sleep(self.interval)
+
+            try:
+                self.check()
+            except (TelloException, TimeoutError, ValueError):
+                # ValueError comes from replies other than ok/error, e.g. on drones without SDK 3.0
+                logging.debug("Could not check video quality", exc_info=True)
+
+    def drop_rate(self, stream: TelloStream) -> Optional[float]:
+        """Fraction of frames lost since the previous call, None when there is no baseline yet."""
+
+        now = time.perf_counter()
+        elapsed = now - self.last_check_timestamp
+        decoded = stream.frames_decoded - self.last_frames_decoded
+        corrupt = stream.frames_dropped - self.last_frames_dropped
+        has_baseline = stream is self.stream
+
+        self.stream = stream
+        self.last_check_timestamp = now
+        self.last_frames_decoded = stream.frames_decoded
+        self.last_frames_dropped = stream.frames_dropped
+
+        if not has_baseline:
+            return None
+
+        expected = self.FPS_VALUES[self.applied.fps] * elapsed
+        missing = max(0.0, expected - decoded)
+        return min(1.0, (missing + corrupt) / expected)
+
+    def check(self) -> None:
+        stream = self.tello.stream
+        if stream is None:
+            return
+
+        drop_rate = self.drop_rate(stream)
+
+        if self.cooldown > 0:
+            # The stream is still resyncing after a settings change
+            self.cooldown -= 1
+            return
+
+        if drop_rate is None:
+            return
+
+        snr = self.tello.get_wifi()
+
+        degrade = (
+            snr < self.SNR_DEGRADE
+            or stream.decode_lag > self.DECODE_LAG_DEGRADE
+            or drop_rate > self.DROP_RATE_DEGRADE
+        )
+        upgrade = (
+            snr > self.SNR_UPGRADE
+            and stream.decode_lag < self.DECODE_LAG_UPGRADE
+            and drop_rate < self.DROP_RATE_UPGRADE
+        )
+
+        if degrade:
+            self.good_checks = 0
+            if self.level < len(self.LEVELS) - 1:
+                self.set_level(self.level + 1)
+        elif upgrade:
+            self.good_checks += 1
+            if self.good_checks >= self.UPGRADE_AFTER and self.level > 0:
+                self.good_checks = 0
+                self.set_level(self.level - 1)
+        else:
+            self.good_checks = 0
+
+    def set_level(self, level: int) -> None:
+        new = self.LEVELS[level]
+        logging.debug(f"Changing video quality: {self.applied} -> {new}")
+
+        commands = [
+            ("resolution", self.tello.set_resolution),
+            ("fps", self.tello.set_fps),
+            ("bitrate", self.tello.set_bitrate),
+        ]
+
+        # Only send the settings that actually change, each command costs a round trip
+        for field, command in commands:
+            value = getattr(new, field)
+            if value == getattr(self.applied, field):
+                continue
+
+            # Retry no sooner than after the cooldown, even if nothing was applied
+            self.cooldown = self.COOLDOWN_CHECKS
+
+            response = command(value)
+            if response != TelloControlResponse.OK:
+                logging.warning(
+                    f"Tello rejected video {field} {value}, staying at {self.applied}"
+                )
+                return
+
+            self.applied = self.applied._replace(**{field: value})
+
+        self.level = level
@@ -0,0 +1,178 @@
+import logging
+import selectors
+import socket
+import threading
+from typing import Callable, Optional
+
+from stella.tello.constants import REACTOR_MAX_READER_FAILURES, REACTOR_SELECT_TIMEOUT
+
+DatagramHandler = Callable[[memoryview, tuple[str, int]], None]
+ErrorHandler = Callable[[Exception], None]
+
+
+class DatagramReader:
+    """Receives datagrams from a socket into a preallocated buffer and passes them to a handler."""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        handler: DatagramHandler,
+        buffer_size: int,
+        on_error: Optional[ErrorHandler] = None,
+    ) -> None:
+        self.socket = sock
+        self.handler = handler
+        self.buffer_size = buffer_size
+        self.on_error = on_error
+
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        # Consecutive handler failures
+        self.failures = 0
+
+    def notify(self, error: Exception) -> None:
+        if self.on_error is None:
+            return
+
+        try:
+            self.on_error(error)
+        except Exception:
+            logging.error("Reader error handler failed", exc_info=True)
+
+    def read(self) -> None:
+        """
+        Drains the socket. Handler errors are contained here and the socket is kept,
+        socket errors are raised so that the reactor can remove the reader.
+        """
+
+        # Drain everything that is queued, the selector only tells us the socket became readable
+        while True:
+            try:
+                size, address = self.socket.recvfrom_into(self.buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionRefusedError:
+                # Delayed ICMP error for something we sent, not a problem with receiving
+                continue
+
+            try:
+                self.handler(self.view[:size], address)
+                self.failures = 0
+            except Exception:
+                self.failures += 1
+
+                # A handler failing on every datagram would flood the log, only
+                # report the first failure of a streak and then summarize it
+                if self.failures == 1:
+                    logging.error("Datagram handler failed", exc_info=True)
+                elif self.failures >= REACTOR_MAX_READER_FAILURES:
+                    logging.error(
+                        f"Datagram handler for {self.socket} failed {self.failures} times in a row"
+                    )
+                    self.failures = 0
+
+
+class TelloReactor:
+    """
+    Multiplexes any number of UDP sockets on a single thread.
+
+    Handlers are called on the reactor thread with a view of the reader's buffer,
+    which is reused for the next datagram, so they must copy whatever they keep.
+    A handler that raises is logged and keeps receiving on the same socket, one that
+    keeps failing is only reported every `REACTOR_MAX_READER_FAILURES` failures.
+    If the socket itself breaks, the reader is removed and `on_error` is called,
+    so that the owner can open a new socket and register it.
+    """
+
+    def __init__(self) -> None:
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    def register(
+        self,
+        sock: socket.socket,
+        handler: DatagramHandler,
+        buffer_size: int = 1024,
+        on_error: Optional[ErrorHandler] = None,
+    ) -> None:
+        sock.setblocking(False)
+
+        with self.lock:
+            # A socket closed without being unregistered keeps its key, and the
+            # kernel may already have given its fd to this one
+            self._remove_closed()
+
+            self.selector.register(
+                sock,
+                selectors.EVENT_READ,
+                DatagramReader(sock, handler, buffer_size, on_error),
+            )
+
+            self.running = True
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name="TelloReactor", daemon=True
+                )
+                self.thread.start()
+
+    def unregister(self, sock: socket.socket) -> None:
+        with self.lock:
+            try:
+                self.selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+
+    def stop(self) -> None:
+        self.running = False
+
+    def _run(self) -> None:
+        while self.running:
+            try:
+                events = self.selector.select(timeout=REACTOR_SELECT_TIMEOUT)
+            except Exception:
+                logging.error("Reactor select failed", exc_info=True)
+                with self.lock:
+                    self._remove_closed()
+                continue
+
+            for key, _ in events:
+                reader: DatagramReader = key.data
+
+                try:
+                    reader.read()
+                except Exception as e:
+                    logging.error(
+                        f"Removing broken reader for {reader.socket}", exc_info=True
+                    )
+                    self._remove(key.fd, reader)
+                    reader.notify(e)
+
+    def _remove(self, fd: int, reader: DatagramReader) -> None:
+        with self.lock:
+            key = self.selector.get_map().get(fd)
+            # The owner may have replaced the socket in the meantime
+            if key is not None and key.data is reader:
+                self.selector.unregister(fd)
+
+    def _remove_closed(self) -> None:
+        for key in list(self.selector.get_map().values()):
+            if key.fileobj.fileno() == -1:
+                self.selector.unregister(key.fd)
+
+
+reactor: Optional[TelloReactor] = None
+reactor_lock = threading.Lock()
+
+
+def get_reactor() -> TelloReactor:
+    """Returns the reactor shared by all Tello sockets in this process."""
+
+    global reactor
+
+    with reactor_lock:
+        if reactor is None:
+            reactor = TelloReactor()
+
+        return reactor
@@ -0,0 +1,286 @@
+import logging
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import BinaryIO, Iterator, Optional, Union
+
+import av
+import numpy as np
+from stella.tello.constants import (
+    TELLO_STREAM_BUFFER_SIZE,
+    TELLO_STREAM_RECEIVE_BUFFER_SIZE,
+    TELLO_STREAM_HEIGHT,
+    TELLO_STREAM_PORT,
+    TELLO_STREAM_WIDTH,
+)
+from stella.tello.reactor import TelloReactor, get_reactor
+
+logging.getLogger("libav").setLevel(logging.FATAL)
+
+
+class VideoSource(ABC):
+    """
+    Base class for anything `TelloStream` can read frames from.
+
+    Frames are yielded as RGB arrays of shape (height, width, 3), as decoded.
+    """
+
+    def __init__(self) -> None:
+        self.frames_dropped = 0
+        # Exponential moving average of seconds between the data of a frame arriving and the frame being ready
+        self.decode_lag = 0.0
+
+    @abstractmethod
+    def frames(self) -> Iterator[np.ndarray]:
+        pass
+
+    def stop(self) -> None:
+        """Makes `frames` return soon, may be called from another thread."""
+
+    def close(self) -> None:
+        """Releases the source, called from the thread iterating `frames` once it is done."""
+
+
+class ContainerSource(VideoSource):
+    """Decodes video from anything libav can open."""
+
+    def __init__(
+        self,
+        file: Union[str, BinaryIO],
+        format: Optional[str] = None,
+        realtime: bool = False,
+    ) -> None:
+        super().__init__()
+        self.video = av.open(file, format=format)
+        self.realtime = realtime
+
+    def close(self) -> None:
+        self.video.close()
+
+    def arrival(self) -> float:
+        """Time the data of the packet being decoded arrived at, by `time.perf_counter`."""
+
+        return time.perf_counter()
+
+    def frames(self) -> Iterator[np.ndarray]:
+        start_timestamp = time.perf_counter()
+        start_time: Optional[float] = None
+        # Raw H.264 has no timestamps, fall back to the nominal frame rate
+        rate = self.video.streams.video[0].guessed_rate
+        i = 0
+
+        for packet in self.video.demux(video=0):
+            if packet.is_corrupt:
+                self.frames_dropped += 1
+                continue
+
+            received = self.arrival()
+
+            try:
+                frames = packet.decode()
+            except av.error.InvalidDataError:
+                self.frames_dropped += 1
+                continue
+
+            for frame in frames:
+                frame_arr = frame.to_ndarray(format="rgb24")
+
+                lag = time.perf_counter() - received
+                self.decode_lag = 0.9 * self.decode_lag + 0.1 * lag
+
+                if self.realtime:
+                    if frame.time is not None:
+                        frame_time = frame.time
+                    elif rate:
+                        frame_time = i / float(rate)
+                    else:
+                        frame_time = None
+
+                    if frame_time is not None:
+                        if start_time is None:
+                            start_timestamp, start_time = (
+                                time.perf_counter(),
+                                frame_time,
+                            )
+
+                        delay = (frame_time - start_time) - (
+                            time.perf_counter() - start_timestamp
+                        )
+                        if delay > 0:
+                            time.sleep(delay)
+
+                i += 1
+                yield frame_arr
+
+
+class DatagramBuffer:
+    """File-like object libav reads from, filled with datagrams received by the reactor."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Stream offset at the end of each buffered datagram and the time it arrived at,
+        # so that time spent waiting in the buffer counts towards the decode lag
+        self.arrivals: deque[tuple[int, float]] = deque()
+        self.written = 0
+        self.consumed = 0
+        # Arrival time of the last datagram read in full
+        self.arrival = time.perf_counter()
+
+    def write(self, data: memoryview, address: tuple[str, int]) -> None:
+        timestamp = time.perf_counter()
+
+        with self.condition:
+            if len(self.buffer) > TELLO_STREAM_BUFFER_SIZE:
+                # Decoder cannot keep up, skip ahead and let it resync on the next keyframe
+                logging.debug("Video buffer overflow, dropping buffered stream data")
+                self.buffer.clear()
+                self.arrivals.clear()
+                self.consumed = self.written
+
+            self.buffer += data
+            self.written += len(data)
+            self.arrivals.append((self.written, timestamp))
+            self.condition.notify()
+
+    def read(self, size: int = -1) -> bytes:
+        with self.condition:
+            while not self.buffer and not self.closed:
+                self.condition.wait()
+
+            if size < 0:
+                size = len(self.buffer)
+
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+
+            self.consumed += len(data)
+            while self.arrivals and self.arrivals[0][0] <= self.consumed:
+                self.arrival = self.arrivals.popleft()[1]
+
+            return data
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class UdpSource(ContainerSource):
+    """Live H.264 stream sent by Tello."""
+
+    def __init__(
+        self, port: int = TELLO_STREAM_PORT, reactor: Optional[TelloReactor] = None
+    ) -> None:
+        self.port = port
+        self.datagrams = DatagramBuffer()
+        self.reactor = reactor if reactor is not None else get_reactor()
+        self._open_socket()
+
+        super().__init__(self.datagrams, format="h264")
+
+    def _open_socket(self) -> None:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Keyframes arrive as bursts of datagrams, give the kernel room to queue them
+        # until the reactor drains the socket, as libav's own UDP input did
+        self.socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, TELLO_STREAM_RECEIVE_BUFFER_SIZE
+        )
+        self.socket.bind(("", self.port))
+        self.reactor.register(
+            self.socket,
+            self.datagrams.write,
+            buffer_size=2048,
+            on_error=self._reopen_socket,
+        )
+
+    def _reopen_socket(self, error: Exception) -> None:
+        if self.datagrams.closed:
+            return
+
+        logging.warning(f"Video socket failed, reopening it: {error}")
+        self.reactor.unregister(self.socket)
+        self.socket.close()
+        self._open_socket()
+
+    def arrival(self) -> float:
+        return self.datagrams.arrival
+
+    def stop(self) -> None:
+        # Wakes up libav if it is waiting for data, it then sees end of stream
+        self.datagrams.close()
+
+    def close(self) -> None:
+        self.reactor.unregister(self.socket)
+        self.socket.close()
+        self.datagrams.close()
+        super().close()
+
+
+class FileSource(ContainerSource):
+    """
+    Recorded H.264/MP4 file.
+
+    Args:
+        - realtime: play back at the recorded frame rate, otherwise decode as fast as possible
+    """
+
+    def __init__(self, path: str, realtime: bool = True) -> None:
+        super().__init__(path, realtime=realtime)
+
+
+class PipeSource(ContainerSource):
+    """Raw H.264 read from a pipe, e.g. stdin, decoded as fast as it arrives."""
+
+    def __init__(self, file: BinaryIO, format: str = "h264") -> None:
+        super().__init__(file, format=format)
+
+
+class TestPatternSource(VideoSource):
+    """
+    Generated moving gradient, needs neither a drone nor a decoder.
+
+    Args:
+        - realtime: generate frames at `fps`, otherwise as fast as possible
+    """
+
+    def __init__(
+        self,
+        width: int = TELLO_STREAM_WIDTH,
+        height: int = TELLO_STREAM_HEIGHT,
+        fps: int = 30,
+        realtime: bool = True,
+    ) -> None:
+        super().__init__()
+        self.fps = fps
+        self.realtime = realtime
+
+        x = np.linspace(0, 255, width, dtype=np.uint8)
+        y = np.linspace(0, 255, height, dtype=np.uint8)
+        self.pattern = np.empty((height, width, 3), dtype=np.uint8)
+        self.pattern[:, :, 0] = x[np.newaxis, :]
+        self.pattern[:, :, 1] = y[:, np.newaxis]
+        self.pattern[:, :, 2] = 128
+
+        self.running = True
+
+    def stop(self) -> None:
+        self.running = False
+
+    def frames(self) -> Iterator[np.ndarray]:
+        start_timestamp = time.perf_counter()
+        i = 0
+
+        while self.running:
+            if self.realtime:
+                delay = i / self.fps - (time.perf_counter() - start_timestamp)
+                if delay > 0:
+                    time.sleep(delay)
+
+            # Move the pattern a few pixels per frame so stalls are visible
+            yield np.roll(self.pattern, i * 4, axis=1)
+            i += 1
@@ -1,9 +1,9 @@
 import logging
 import socket
-import threading
 from typing import Optional, Union
 
 from stella.tello.constants import TELLO_STATE_PORT
+from stella.tello.reactor import TelloReactor, get_reactor
 
 
 class TelloState:
@@ -30,25 +30,31 @@ class TelloState:
         "agz": float,
     }
 
-    def __init__(self) -> None:
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(("", TELLO_STATE_PORT))
-
+    def __init__(self, reactor: Optional[TelloReactor] = None) -> None:
         self._state: Optional[str] = None
 
-        self.receive_thread = threading.Thread(
-            target=self._receive_state, name="TelloStateReceiver", daemon=True
+        self.reactor = reactor if reactor is not None else get_reactor()
+        self._open_socket()
+
+    def __del__(self) -> None:
+        self.reactor.unregister(self.socket)
+        self.socket.close()
+
+    def _open_socket(self) -> None:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("", TELLO_STATE_PORT))
+        self.reactor.register(
+            self.socket, self._receive_state, on_error=self._reopen_socket
         )
-        self.receive_thread.start()
 
-    def _receive_state(self) -> None:
-        while True:
-            try:
-                response, _ = self.socket.recvfrom(1024)
-                self._state = response.decode("ascii")
-            except Exception:
-                logging.error("Unknown error occurred", exc_info=True)
-                break
+    def _reopen_socket(self, error: Exception) -> None:
+        logging.warning(f"State socket failed, reopening it: {error}")
+        self.reactor.unregister(self.socket)
+        self.socket.close()
+        self._open_socket()
+
+    def _receive_state(self, data: memoryview, address: tuple[str, int]) -> None:
+        self._state = str(data, "ascii")
 
     def get_state(self) -> Optional[dict[str, Union[int, float, str]]]:
         if self._state is None:
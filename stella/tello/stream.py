@@ -1,30 +1,81 @@
 import logging
 import threading
+import time
 from typing import Optional
 
-import av
 import numpy as np
-from stella.tello.constants import TELLO_STREAM_PORT
-
-logging.getLogger("libav").setLevel(logging.FATAL)
+from stella.tello.broker import FrameBroker
+from stella.tello.constants import STREAM_CLOSE_TIMEOUT
+from stella.tello.sources import UdpSource, VideoSource
 
 
 class TelloStream:
-    def __init__(self) -> None:
-        self.video = av.open(f"udp://0.0.0.0:{TELLO_STREAM_PORT}")
+    def __init__(
+        self,
+        source: Optional[VideoSource] = None,
+        broker: Optional[FrameBroker] = None,
+    ) -> None:
+        self.source = source if source is not None else UdpSource()
         self.frame: Optional[np.ndarray] = None
+        self.broker = broker
+
+        self.frames_decoded = 0
 
+        self.running = True
         self.receive_thread = threading.Thread(
             target=self._receive_video, name="TelloStreamReceiver", daemon=True
         )
         self.receive_thread.start()
 
-    def __del__(self) -> None:
-        self.video.close()
+    def close(self) -> None:
+        """Stops receiving and waits for the receiver thread, which closes the source on its way out."""
+
+        self.running = False
+        self.source.stop()
+        self.receive_thread.join(timeout=STREAM_CLOSE_TIMEOUT)
+
+    @property
+    def resolution(self) -> Optional[tuple[int, int]]:
+        """Width and height of the latest frame, these change when Tello switches resolution."""
+
+        if self.frame is None:
+            return None
+
+        return self.frame.shape[0], self.frame.shape[1]
+
+    @property
+    def frames_dropped(self) -> int:
+        return self.source.frames_dropped
+
+    @property
+    def decode_lag(self) -> float:
+        return self.source.decode_lag
 
     def _receive_video(self) -> None:
-        for frame in self.video.decode(video=0):
-            frame_arr = frame.to_ndarray(format="rgb24")
+        start_timestamp = time.perf_counter()
+
+        try:
+            self._decode_frames()
+        finally:
+            self.source.close()
+
+        elapsed = time.perf_counter() - start_timestamp
+        logging.debug(
+            f"Video source finished: {self.frames_decoded} frames in {elapsed:.2f} s "
+            f"({self.frames_decoded / elapsed:.1f} fps), {self.frames_dropped} dropped"
+        )
+
+    def _decode_frames(self) -> None:
+        for frame_arr in self.source.frames():
+            if not self.running:
+                break
+
+            # Other processes get the frame as decoded, the transform is only for pygame's surfarray
+            if self.broker is not None:
+                self.broker.publish(frame_arr)
+
             frame_arr = np.rot90(frame_arr)
             frame_arr = np.flipud(frame_arr)
             self.frame = frame_arr
+
+            self.frames_decoded += 1
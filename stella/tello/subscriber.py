@@ -0,0 +1,203 @@
+import socket
+import struct
+import time
+from enum import Enum
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+from stella.tello.broker import SLOT_HEADER, slot_offset
+from stella.tello.constants import (
+    BROKER_CONTROL_PORT,
+    BROKER_SUBSCRIBER_LEASE,
+    RESPONSE_TIMEOUT,
+)
+from stella.tello.exceptions import TelloInvalidResponse, TelloNoConnection
+
+
+class FrameDropPolicy(str, Enum):
+    LATEST = "latest"
+    SEQUENTIAL = "sequential"
+
+
+class SharedFrame(np.ndarray):
+    """Array backed by shared memory, keeps the mapping alive for as long as it or any view of it exists."""
+
+    def __array_finalize__(self, obj: Optional[np.ndarray]) -> None:
+        self.shm = getattr(obj, "shm", None)
+
+
+class FrameSubscriber:
+    """
+    Reads frames published by a `FrameBroker` running in another process.
+
+    Frames are RGB arrays of shape (height, width, 3), returned as zero-copy views
+    into the shared memory ring. The mapping
+    stays alive while any frame is referenced, even after `close`, but its contents
+    are only valid until the broker wraps around and overwrites the slot, which
+    can be checked with `is_valid`. Copy the frame if it has to outlive that.
+
+    The subscription is a lease renewed by `read`, a subscriber that stops reading
+    for longer than `BROKER_SUBSCRIBER_LEASE` is no longer notified until it reads again.
+
+    Args:
+        - policy: LATEST always skips to the newest frame, SEQUENTIAL returns every
+          frame in order and only drops frames that were overwritten before being read
+    """
+
+    def __init__(
+        self,
+        policy: FrameDropPolicy = FrameDropPolicy.LATEST,
+        port: int = BROKER_CONTROL_PORT,
+    ) -> None:
+        self.policy = policy
+        self.broker_address = ("127.0.0.1", port)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.slots = 0
+        self.slot_size = 0
+
+        self.last_sequence = 0
+        self.dropped = 0
+        self.last_renewal = 0.0
+
+    def __del__(self) -> None:
+        self.close()
+
+    def connect(self) -> None:
+        self.socket.sendto(b"subscribe", self.broker_address)
+        self.last_renewal = time.monotonic()
+        deadline = self.last_renewal + RESPONSE_TIMEOUT
+
+        # A frame notification may overtake the reply to our subscribe
+        ring = None
+        while ring is None:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                raise TelloNoConnection("Frame broker is not running")
+
+            self.socket.settimeout(wait)
+            try:
+                response, _ = self.socket.recvfrom(1024)
+            except (TimeoutError, ConnectionRefusedError):
+                raise TelloNoConnection("Frame broker is not running")
+
+            ring = self.parse_ring(response)
+
+        self.attach(ring)
+        self.last_sequence = self.latest_sequence()
+
+    @staticmethod
+    def parse_ring(response: bytes) -> Optional[tuple[str, int, int]]:
+        """Parses a ring description into its name, slot count and slot size."""
+
+        if not response.startswith(b"shm:"):
+            return None
+
+        ring: dict[str, str] = {}
+        for field in response.decode("ascii").split(";"):
+            arr = field.split(":")
+            if len(arr) == 2:
+                ring[arr[0]] = arr[1]
+
+        if not {"shm", "slots", "size"} <= ring.keys():
+            raise TelloInvalidResponse("Frame broker returned invalid ring description")
+
+        return ring["shm"], int(ring["slots"]), int(ring["size"])
+
+    def attach(self, ring: tuple[str, int, int]) -> None:
+        name, self.slots, self.slot_size = ring
+
+        # Frames read from a previous ring keep their own reference to it
+        self.shm = shared_memory.SharedMemory(name=name)
+        # The broker owns the segment, do not let this process' resource tracker unlink it on exit
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+
+    def close(self) -> None:
+        if getattr(self, "shm", None) is None:
+            return
+
+        try:
+            self.socket.sendto(b"unsubscribe", self.broker_address)
+        except OSError:
+            pass
+
+        self.socket.close()
+        # Frames handed out by `read` hold their own reference, the mapping is
+        # released once the last of them is gone
+        self.shm = None
+
+    def latest_sequence(self) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, 0)[0]
+
+    def is_valid(self, sequence: int) -> bool:
+        """Checks whether the frame with the given sequence number is still in its slot."""
+
+        offset = slot_offset(sequence % self.slots, self.slot_size)
+        return SLOT_HEADER.unpack_from(self.shm.buf, offset)[0] == sequence
+
+    def read(self, timeout: Optional[float] = None) -> Optional[tuple[int, np.ndarray]]:
+        """
+        Waits for the next frame according to the drop policy.
+
+        Returns a tuple of the frame sequence number and its view, or None on timeout.
+        """
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            if time.monotonic() - self.last_renewal > BROKER_SUBSCRIBER_LEASE / 2:
+                self.socket.sendto(b"subscribe", self.broker_address)
+                self.last_renewal = time.monotonic()
+
+            latest = self.latest_sequence()
+
+            if latest > self.last_sequence:
+                if self.policy == FrameDropPolicy.LATEST:
+                    sequence = latest
+                else:
+                    # The oldest slot is the one the broker writes next, leave it alone
+                    sequence = max(self.last_sequence + 1, latest - self.slots + 2)
+
+                self.dropped += sequence - self.last_sequence - 1
+                self.last_sequence = sequence
+
+                offset = slot_offset(sequence % self.slots, self.slot_size)
+                slot_sequence, rows, cols, channels = SLOT_HEADER.unpack_from(
+                    self.shm.buf, offset
+                )
+                if slot_sequence != sequence:
+                    # Overwritten before we got to it
+                    self.dropped += 1
+                    continue
+
+                frame = SharedFrame(
+                    (rows, cols, channels),
+                    dtype=np.uint8,
+                    buffer=self.shm.buf,
+                    offset=offset + SLOT_HEADER.size,
+                )
+                frame.shm = self.shm
+                return sequence, frame
+
+            # Wake up in time to renew the lease even if no notifications arrive
+            wait = BROKER_SUBSCRIBER_LEASE / 2
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return None
+
+            # Notifications only wake us up, the ring header is the source of truth
+            self.socket.settimeout(wait)
+            try:
+                response = self.socket.recv(1024)
+            except TimeoutError:
+                continue
+
+            # The broker replaced the ring to fit larger frames
+            ring = self.parse_ring(response)
+            if ring is not None and ring != (self.shm.name, self.slots, self.slot_size):
+                self.attach(ring)